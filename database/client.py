@@ -1,14 +1,23 @@
-from supabase import create_client, Client
+from supabase import create_client, acreate_client, Client, AsyncClient
 import os
 from dotenv import load_dotenv
 
 load_dotenv()  # Carga variables del archivo .env
 
-def init_supabase() -> Client:
+def _get_credentials():
     url = os.getenv("SUPABASE_URL")
     key = os.getenv("SUPABASE_KEY")
 
     if not url or not key:
         raise ValueError("Supabase URL or KEY not found in environment variables")
 
+    return url, key
+
+def init_supabase() -> Client:
+    url, key = _get_credentials()
     return create_client(url, key)
+
+async def init_async_supabase() -> AsyncClient:
+    # Realtime en supabase-py solo está disponible con el cliente asíncrono
+    url, key = _get_credentials()
+    return await acreate_client(url, key)
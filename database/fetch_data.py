@@ -30,3 +30,32 @@ def get_user_data(supabase, user_id):
     previous = recommendations_resp.data
 
     return movements, previous
+
+def get_user_ids_pending_recommendation(supabase, days=3):
+    # Usuarios con transacciones posteriores a su última recomendación,
+    # p. ej. las registradas mientras el worker en tiempo real estaba detenido
+    since = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+
+    transactions = supabase.table("transactions") \
+        .select("uid, date") \
+        .gte("date", since) \
+        .execute().data
+
+    recommendations = supabase.table("recommendations") \
+        .select("uid, date") \
+        .gte("date", since) \
+        .execute().data
+
+    last_recommendation = {}
+    for record in recommendations:
+        uid, date = record.get("uid"), (record.get("date") or "")[:10]
+        if uid and date > last_recommendation.get(uid, ""):
+            last_recommendation[uid] = date
+
+    user_ids = set()
+    for record in transactions:
+        uid, date = record.get("uid"), (record.get("date") or "")[:10]
+        if uid and date > last_recommendation.get(uid, ""):
+            user_ids.add(uid)
+
+    return list(user_ids)
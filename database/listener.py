@@ -0,0 +1,382 @@
+import asyncio
+
+# Evento broadcast que el worker se envía a sí mismo para comprobar la conexión
+PING_EVENT = "worker_ping"
+
+def extract_inserted_record(payload):
+    """
+    Obtiene el registro insertado de un payload de postgres_changes
+
+    Args:
+        payload (dict): Payload entregado por el canal de Supabase Realtime
+
+    Returns:
+        dict: Registro insertado o None si el payload no lo contiene
+    """
+    if not isinstance(payload, dict):
+        return None
+
+    # realtime-py entrega {"data": {"record": {...}, ...}}; el protocolo crudo usa "new"
+    data = payload.get("data", payload)
+    if not isinstance(data, dict):
+        return None
+
+    return data.get("record") or data.get("new")
+
+class TransactionDebouncer:
+    """
+    Agrupa inserciones en transactions por usuario y dispara el procesamiento
+    cuando pasan `delay_seconds` desde la última transacción de ese usuario
+    """
+
+    def __init__(self, process_user, delay_seconds):
+        """
+        Args:
+            process_user (callable): Función async que recibe el user_id a procesar
+            delay_seconds (float): Tiempo de espera tras la última transacción
+        """
+        self.process_user = process_user
+        self.delay_seconds = delay_seconds
+        self._pending = {}
+        # Usuarios con una ejecución en curso y si necesitan otra al terminar
+        self._running = {}
+        self._rerun = set()
+
+    def pending_users(self):
+        return list(self._pending.keys())
+
+    def on_insert(self, payload):
+        """
+        Callback para el canal: reinicia el temporizador del usuario afectado
+        """
+        record = extract_inserted_record(payload)
+        user_id = record.get("uid") if record else None
+
+        if not user_id:
+            print(f"⚠️ Evento sin uid ignorado: {payload}")
+            return
+
+        self.schedule(user_id)
+
+    def schedule(self, user_id):
+        """
+        Programa (o reprograma) la recomendación de un usuario
+        """
+        previous = self._pending.get(user_id)
+        if previous and not previous.done():
+            previous.cancel()
+
+        self._pending[user_id] = asyncio.get_running_loop().create_task(self._wait_and_process(user_id))
+        print(f"⏳ Transacción recibida para {user_id}, recomendación en {self.delay_seconds}s")
+
+    async def _wait_and_process(self, user_id):
+        try:
+            await asyncio.sleep(self.delay_seconds)
+        except asyncio.CancelledError:
+            # Llegó otra transacción del mismo usuario; el nuevo temporizador lo reemplaza
+            return
+
+        # Ya no se puede cancelar: se retira antes de procesar
+        self._pending.pop(user_id, None)
+
+        if user_id in self._running:
+            # Hay una ejecución en curso: se repite una sola vez cuando termine
+            self._rerun.add(user_id)
+            return
+
+        self._running[user_id] = asyncio.current_task()
+        await self._run(user_id)
+
+    async def _run(self, user_id):
+        try:
+            while True:
+                try:
+                    await self.process_user(user_id)
+                except Exception as e:
+                    print(f"❌ Error procesando usuario {user_id}: {e}")
+
+                if user_id not in self._rerun:
+                    break
+                self._rerun.discard(user_id)
+        finally:
+            self._running.pop(user_id, None)
+
+    async def flush(self, timeout=None, concurrency=4):
+        """
+        Procesa de inmediato los usuarios pendientes y espera a las ejecuciones
+        en curso (útil al apagar el worker)
+
+        Args:
+            timeout (float): Segundos máximos de espera; None espera sin límite
+            concurrency (int): Usuarios pendientes procesados a la vez
+
+        Returns:
+            list: user_ids que quedaron sin procesar
+        """
+        user_ids = self.pending_users()
+        for user_id in user_ids:
+            self._pending.pop(user_id).cancel()
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run_pending(user_id):
+            async with semaphore:
+                if user_id in self._running:
+                    self._rerun.add(user_id)
+                    return
+                self._running[user_id] = asyncio.current_task()
+                await self._run(user_id)
+
+        tasks = {task: user_id for user_id, task in self._running.items()}
+        for user_id in user_ids:
+            tasks[asyncio.create_task(run_pending(user_id))] = user_id
+
+        if not tasks:
+            return []
+
+        not_done = set(tasks)
+        try:
+            _, not_done = await asyncio.wait(tasks, timeout=timeout)
+        finally:
+            # También se registra si el apagado se interrumpe (p. ej. un segundo Ctrl-C)
+            unprocessed = sorted({tasks[task] for task in not_done} | self._rerun)
+            for task in not_done:
+                task.cancel()
+            if unprocessed:
+                print(f"⚠️ Usuarios sin procesar al detener el worker: {unprocessed}")
+
+        return unprocessed
+
+class ConnectionMonitor:
+    """
+    Vigila la conexión realtime sin interferir con la reconexión automática de
+    realtime-py: solo se da por perdida si sigue caída más de `grace_seconds`
+    """
+
+    def __init__(self, channel, socket=None, grace_seconds=120, interval=5, on_recover=None):
+        """
+        Args:
+            channel: Canal de Supabase Realtime (o LocalChannel)
+            socket: Cliente realtime subyacente (opcional), p. ej. client.realtime
+            grace_seconds (float): Tiempo máximo que se tolera la conexión caída
+            interval (float): Segundos entre cada verificación
+            on_recover (callable): Función async llamada cuando la conexión se recupera
+        """
+        self.channel = channel
+        self.socket = socket
+        self.grace_seconds = grace_seconds
+        self.interval = interval
+        self.on_recover = on_recover
+        self.status = None
+        self._last_pong = None
+        self._changed = asyncio.Event()
+
+    def on_status(self, status, error=None):
+        """
+        Callback de estado de la suscripción (SUBSCRIBED, CHANNEL_ERROR, TIMED_OUT, CLOSED)
+        """
+        self.status = getattr(status, "value", status)
+
+        if self.status == "SUBSCRIBED" and not error:
+            print(f"📡 Estado de suscripción realtime: {self.status}")
+        else:
+            print(f"⚠️ Estado de suscripción realtime: {self.status} {error or ''}".strip())
+
+        self._changed.set()
+
+    def on_pong(self, payload):
+        self._last_pong = asyncio.get_running_loop().time()
+
+    def _connection_problem(self):
+        if self.socket is not None and not self.socket.is_connected:
+            return "websocket desconectado"
+
+        state = getattr(self.channel.state, "value", self.channel.state)
+        if state != "joined":
+            return f"canal en estado {state}"
+
+        if self.status != "SUBSCRIBED":
+            return f"suscripción en estado {self.status}"
+
+        return None
+
+    def problem(self):
+        """
+        Returns:
+            str: Descripción del problema de conexión o None si todo está bien
+        """
+        problem = self._connection_problem()
+        if problem:
+            return problem
+
+        # Un cierre limpio del websocket no cambia ningún indicador: solo se nota
+        # porque el broadcast que nos enviamos deja de volver
+        if self._last_pong is not None:
+            silence = asyncio.get_running_loop().time() - self._last_pong
+            if silence > 3 * self.interval:
+                return f"sin respuesta del canal en {silence:.0f}s"
+
+        return None
+
+    async def _wait_for_change(self, timeout):
+        self._changed.clear()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def wait_subscribed(self, timeout):
+        """
+        Espera la primera confirmación SUBSCRIBED
+
+        Raises:
+            ConnectionError: Si no se confirma en `timeout` segundos
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        while self.status != "SUBSCRIBED":
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise ConnectionError(f"La suscripción realtime no se confirmó en {timeout}s (estado: {self.status})")
+            await self._wait_for_change(remaining)
+
+    async def _ping(self):
+        try:
+            await self.channel.send_broadcast(PING_EVENT, {})
+        except Exception as e:
+            print(f"⚠️ No se pudo enviar el ping realtime: {e}")
+
+    async def wait_until_lost(self):
+        """
+        Espera hasta que la conexión lleve caída más de `grace_seconds`
+
+        Returns:
+            str: Descripción del último problema detectado
+        """
+        loop = asyncio.get_running_loop()
+        unhealthy_since = None
+
+        while True:
+            problem = self.problem()
+
+            if problem is None:
+                if unhealthy_since is not None:
+                    print("✅ Conexión realtime recuperada")
+                    unhealthy_since = None
+                    if self.on_recover:
+                        await self.on_recover()
+
+                if self._last_pong is None:
+                    self._last_pong = loop.time()
+                await self._ping()
+            else:
+                if self._connection_problem():
+                    # Mientras realtime-py reconecta no se espera respuesta al ping
+                    self._last_pong = None
+                else:
+                    await self._ping()
+
+                if unhealthy_since is None:
+                    print(f"⚠️ Problema en realtime ({problem}), esperando reconexión automática...")
+                    unhealthy_since = loop.time()
+                elif loop.time() - unhealthy_since >= self.grace_seconds:
+                    print(f"❌ Realtime no se recuperó en {self.grace_seconds}s: {problem}")
+                    return problem
+
+            await self._wait_for_change(self.interval)
+
+class LocalChannel:
+    """
+    Sustituto local de un canal de Supabase Realtime para pruebas sin red.
+    Expone la misma interfaz usada por el worker (on_postgres_changes,
+    on_broadcast, subscribe, send_broadcast, state) y permite simular
+    inserciones con `emit` y cambios de estado con `set_status`.
+    """
+
+    def __init__(self, subscribe_status="SUBSCRIBED"):
+        self._callbacks = []
+        self._broadcast_callbacks = []
+        self._status_callback = None
+        self.subscribe_status = subscribe_status
+        self.state = "closed"
+        # Si es False los broadcasts no vuelven, como con un websocket cerrado
+        self.echo_broadcasts = True
+
+    def on_postgres_changes(self, event, callback, table="*", schema="public", filter=None):
+        self._callbacks.append((event, schema, table, callback))
+        return self
+
+    def on_broadcast(self, event, callback):
+        self._broadcast_callbacks.append((event, callback))
+        return self
+
+    async def subscribe(self, callback=None):
+        self._status_callback = callback
+        self.set_status(self.subscribe_status)
+        return self
+
+    async def unsubscribe(self):
+        self.state = "closed"
+
+    async def send_broadcast(self, event, data):
+        if not self.echo_broadcasts or self.state != "joined":
+            return
+
+        payload = {"type": "broadcast", "event": event, "payload": data}
+        for cb_event, callback in self._broadcast_callbacks:
+            if cb_event == event:
+                callback(payload)
+
+    def set_status(self, status, error=None):
+        """
+        Simula un cambio de estado de la suscripción (SUBSCRIBED, CHANNEL_ERROR, TIMED_OUT, CLOSED)
+        """
+        if status == "SUBSCRIBED":
+            self.state = "joined"
+        elif status == "CLOSED":
+            self.state = "closed"
+        else:
+            self.state = "errored"
+
+        if self._status_callback:
+            self._status_callback(status, error)
+
+    def emit(self, record, table="transactions", schema="public", event="INSERT"):
+        """
+        Simula una inserción con el mismo formato de payload que realtime-py
+        """
+        payload = {
+            "data": {
+                "schema": schema,
+                "table": table,
+                "type": event,
+                "record": record,
+                "errors": None,
+            },
+            "ids": [],
+        }
+
+        for cb_event, cb_schema, cb_table, callback in self._callbacks:
+            if cb_event not in ("*", event) or cb_schema != schema or cb_table not in ("*", table):
+                continue
+            callback(payload)
+
+async def subscribe_to_transactions(channel, debouncer, monitor, timeout=30):
+    """
+    Suscribe el debouncer a las inserciones de la tabla transactions
+
+    Args:
+        channel: Canal de Supabase Realtime (o LocalChannel)
+        debouncer (TransactionDebouncer): Receptor de los eventos
+        monitor (ConnectionMonitor): Recibe los cambios de estado y los pings
+        timeout (float): Segundos máximos para confirmar la suscripción
+
+    Raises:
+        ConnectionError: Si la suscripción no se confirma como SUBSCRIBED
+    """
+    channel.on_postgres_changes("INSERT", schema="public", table="transactions", callback=debouncer.on_insert)
+    channel.on_broadcast(PING_EVENT, monitor.on_pong)
+    await channel.subscribe(monitor.on_status)
+    await monitor.wait_subscribed(timeout)
+    return channel
@@ -0,0 +1,4 @@
+import os
+
+# llm.gemini_api exige la API key al importarse; las pruebas nunca llaman a Gemini
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
@@ -0,0 +1,39 @@
+from database.fetch_data import get_user_ids_pending_recommendation
+
+class FakeQuery:
+    def __init__(self, rows):
+        self.data = rows
+
+    def select(self, *args):
+        return self
+
+    def gte(self, *args):
+        return self
+
+    def execute(self):
+        return self
+
+class FakeSupabase:
+    def __init__(self, tables):
+        self.tables = tables
+
+    def table(self, name):
+        return FakeQuery(self.tables[name])
+
+def test_pending_users_have_transactions_after_last_recommendation():
+    supabase = FakeSupabase({
+        "transactions": [
+            {"uid": "new", "date": "2026-10-18"},
+            {"uid": "done", "date": "2026-10-17"},
+            {"uid": "late", "date": "2026-10-16"},
+            {"uid": "late", "date": "2026-10-19T10:00:00"},
+            {"uid": None, "date": "2026-10-19"},
+        ],
+        "recommendations": [
+            {"uid": "done", "date": "2026-10-17"},
+            {"uid": "late", "date": "2026-10-15"},
+            {"uid": "late", "date": "2026-10-18"},
+        ],
+    })
+
+    assert sorted(get_user_ids_pending_recommendation(supabase)) == ["late", "new"]
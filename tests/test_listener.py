@@ -0,0 +1,320 @@
+import asyncio
+
+import pytest
+
+from database.listener import (
+    ConnectionMonitor,
+    LocalChannel,
+    TransactionDebouncer,
+    subscribe_to_transactions,
+)
+
+DELAY = 0.05
+
+def run(coro):
+    return asyncio.run(coro)
+
+async def _subscribed(process_user, delay=DELAY):
+    debouncer = TransactionDebouncer(process_user, delay)
+    channel = LocalChannel()
+    monitor = ConnectionMonitor(channel, interval=DELAY)
+    await subscribe_to_transactions(channel, debouncer, monitor, timeout=DELAY)
+    return debouncer, channel
+
+def test_debounce_resets_on_new_transaction():
+    async def scenario():
+        processed = []
+
+        async def process_user(user_id):
+            processed.append(user_id)
+
+        debouncer, channel = await _subscribed(process_user)
+
+        channel.emit({"uid": "a"})
+        await asyncio.sleep(DELAY * 0.6)
+        channel.emit({"uid": "a"})
+        await asyncio.sleep(DELAY * 0.6)
+        # El segundo evento reinició el temporizador: aún no se procesa
+        assert processed == []
+
+        await asyncio.sleep(DELAY)
+        assert processed == ["a"]
+        assert debouncer.pending_users() == []
+
+    run(scenario())
+
+def test_users_are_debounced_independently():
+    async def scenario():
+        processed = []
+
+        async def process_user(user_id):
+            processed.append(user_id)
+
+        _, channel = await _subscribed(process_user)
+
+        channel.emit({"uid": "a"})
+        channel.emit({"uid": "b"})
+        await asyncio.sleep(DELAY * 3)
+        assert sorted(processed) == ["a", "b"]
+
+    run(scenario())
+
+def test_events_without_uid_are_ignored():
+    async def scenario():
+        processed = []
+
+        async def process_user(user_id):
+            processed.append(user_id)
+
+        debouncer, channel = await _subscribed(process_user)
+
+        channel.emit({})
+        channel.emit({"uid": None, "amount": 10})
+        assert debouncer.pending_users() == []
+
+        await asyncio.sleep(DELAY * 2)
+        assert processed == []
+
+    run(scenario())
+
+def test_only_transaction_inserts_are_handled():
+    async def scenario():
+        processed = []
+
+        async def process_user(user_id):
+            processed.append(user_id)
+
+        debouncer, channel = await _subscribed(process_user)
+
+        channel.emit({"uid": "a"}, table="recommendations")
+        channel.emit({"uid": "a"}, event="UPDATE")
+        channel.emit({"uid": "a"}, schema="private")
+        assert debouncer.pending_users() == []
+
+        await asyncio.sleep(DELAY * 2)
+        assert processed == []
+
+    run(scenario())
+
+def test_flush_processes_pending_users_immediately():
+    async def scenario():
+        processed = []
+
+        async def process_user(user_id):
+            processed.append(user_id)
+
+        debouncer, channel = await _subscribed(process_user, delay=60)
+
+        channel.emit({"uid": "a"})
+        channel.emit({"uid": "b"})
+        assert await debouncer.flush() == []
+
+        assert sorted(processed) == ["a", "b"]
+        assert debouncer.pending_users() == []
+
+    run(scenario())
+
+def test_flush_runs_pending_users_concurrently():
+    async def scenario():
+        active = 0
+        max_active = 0
+
+        async def process_user(user_id):
+            nonlocal active, max_active
+            active += 1
+            max_active = max(max_active, active)
+            await asyncio.sleep(DELAY)
+            active -= 1
+
+        debouncer = TransactionDebouncer(process_user, 60)
+        for user_id in "abcde":
+            debouncer.schedule(user_id)
+
+        await debouncer.flush(concurrency=2)
+        assert max_active == 2
+
+    run(scenario())
+
+def test_flush_timeout_reports_unprocessed_users():
+    async def scenario():
+        processed = []
+
+        async def process_user(user_id):
+            await asyncio.sleep(DELAY if user_id == "fast" else 60)
+            processed.append(user_id)
+
+        debouncer = TransactionDebouncer(process_user, 60)
+        debouncer.schedule("fast")
+        debouncer.schedule("slow")
+
+        assert await debouncer.flush(timeout=DELAY * 3) == ["slow"]
+        assert processed == ["fast"]
+
+    run(scenario())
+
+def test_errors_in_one_user_do_not_affect_others():
+    async def scenario():
+        processed = []
+
+        async def process_user(user_id):
+            if user_id == "broken":
+                raise RuntimeError("boom")
+            processed.append(user_id)
+
+        _, channel = await _subscribed(process_user)
+
+        channel.emit({"uid": "broken"})
+        channel.emit({"uid": "a"})
+        await asyncio.sleep(DELAY * 3)
+        assert processed == ["a"]
+
+        # El usuario puede volver a procesarse con una nueva transacción
+        channel.emit({"uid": "a"})
+        await asyncio.sleep(DELAY * 3)
+        assert processed == ["a", "a"]
+
+    run(scenario())
+
+def test_runs_for_same_user_never_overlap():
+    async def scenario():
+        runs = []
+        active = 0
+        max_active = 0
+
+        async def process_user(user_id):
+            nonlocal active, max_active
+            active += 1
+            max_active = max(max_active, active)
+            runs.append(user_id)
+            await asyncio.sleep(DELAY * 4)
+            active -= 1
+
+        _, channel = await _subscribed(process_user, delay=DELAY / 5)
+
+        channel.emit({"uid": "a"})
+        await asyncio.sleep(DELAY)
+        # Varias transacciones durante la ejecución: una sola ejecución adicional
+        for _ in range(3):
+            channel.emit({"uid": "a"})
+            await asyncio.sleep(DELAY / 2)
+
+        await asyncio.sleep(DELAY * 10)
+        assert runs == ["a", "a"]
+        assert max_active == 1
+
+    run(scenario())
+
+def test_flush_waits_for_running_users():
+    async def scenario():
+        finished = []
+
+        async def process_user(user_id):
+            await asyncio.sleep(DELAY * 2)
+            finished.append(user_id)
+
+        debouncer, channel = await _subscribed(process_user, delay=0)
+
+        channel.emit({"uid": "a"})
+        await asyncio.sleep(DELAY / 2)
+        await debouncer.flush()
+        assert finished == ["a"]
+
+    run(scenario())
+
+@pytest.mark.parametrize("status", ["CHANNEL_ERROR", "TIMED_OUT", "CLOSED"])
+def test_unconfirmed_subscription_raises(status):
+    async def scenario():
+        async def process_user(user_id):
+            pass
+
+        channel = LocalChannel(subscribe_status=status)
+        monitor = ConnectionMonitor(channel, interval=DELAY)
+        with pytest.raises(ConnectionError):
+            await subscribe_to_transactions(channel, TransactionDebouncer(process_user, DELAY), monitor, timeout=DELAY)
+
+    run(scenario())
+
+def test_subscription_confirmed_after_rejoin():
+    async def scenario():
+        async def process_user(user_id):
+            pass
+
+        channel = LocalChannel(subscribe_status="TIMED_OUT")
+        monitor = ConnectionMonitor(channel, interval=DELAY)
+        asyncio.get_running_loop().call_later(DELAY, channel.set_status, "SUBSCRIBED")
+
+        await subscribe_to_transactions(channel, TransactionDebouncer(process_user, DELAY), monitor, timeout=DELAY * 4)
+        assert monitor.status == "SUBSCRIBED"
+
+    run(scenario())
+
+class FakeSocket:
+    is_connected = True
+
+async def _monitored(grace, socket=None, on_recover=None):
+    async def process_user(user_id):
+        pass
+
+    channel = LocalChannel()
+    monitor = ConnectionMonitor(channel, socket, grace_seconds=grace, interval=DELAY / 5, on_recover=on_recover)
+    await subscribe_to_transactions(channel, TransactionDebouncer(process_user, DELAY), monitor, timeout=DELAY)
+    return channel, monitor, asyncio.create_task(monitor.wait_until_lost())
+
+def test_monitor_tolerates_short_outages_and_recovers():
+    async def scenario():
+        recovered = []
+
+        async def on_recover():
+            recovered.append(True)
+
+        socket = FakeSocket()
+        channel, _, waiter = await _monitored(DELAY * 4, socket, on_recover)
+
+        # Reconexión automática: websocket caído y canal con error por un momento
+        socket.is_connected = False
+        await asyncio.sleep(DELAY)
+        socket.is_connected = True
+        channel.set_status("CHANNEL_ERROR")
+        await asyncio.sleep(DELAY)
+        channel.set_status("SUBSCRIBED")
+        await asyncio.sleep(DELAY)
+
+        assert not waiter.done()
+        assert recovered == [True]
+        waiter.cancel()
+
+    run(scenario())
+
+def test_monitor_gives_up_when_channel_stays_errored():
+    async def scenario():
+        channel, _, waiter = await _monitored(DELAY * 2)
+
+        channel.set_status("CHANNEL_ERROR", "boom")
+        problem = await asyncio.wait_for(waiter, DELAY * 6)
+        assert "errored" in problem
+
+    run(scenario())
+
+def test_monitor_gives_up_when_socket_stays_disconnected():
+    async def scenario():
+        socket = FakeSocket()
+        _, _, waiter = await _monitored(DELAY * 2, socket)
+
+        socket.is_connected = False
+        problem = await asyncio.wait_for(waiter, DELAY * 6)
+        assert "websocket" in problem
+
+    run(scenario())
+
+def test_monitor_detects_silently_closed_connection():
+    async def scenario():
+        channel, _, waiter = await _monitored(DELAY * 2)
+        await asyncio.sleep(DELAY)
+        assert not waiter.done()
+
+        # Cierre limpio: los indicadores no cambian pero los pings dejan de volver
+        channel.echo_broadcasts = False
+        problem = await asyncio.wait_for(waiter, DELAY * 10)
+        assert "sin respuesta" in problem
+
+    run(scenario())
@@ -0,0 +1,44 @@
+import pytest
+
+import main
+
+RECOMMENDATION = {"title": "Ahorra", "desc": "Gastaste $500 en comida", "type": "excessive_expenses"}
+
+@pytest.fixture
+def saved(monkeypatch):
+    saved = []
+    monkeypatch.setattr(main, "build_prompt", lambda movements, previous: "prompt")
+    monkeypatch.setattr(main, "save_recommendation", lambda supabase, user_id, rec: saved.append((user_id, rec)))
+    return saved
+
+def test_process_user_with_movements(monkeypatch, saved):
+    monkeypatch.setattr(main, "get_user_data", lambda supabase, user_id: ([{"amount": 500}], []))
+    monkeypatch.setattr(main, "get_recommendation", lambda prompt: RECOMMENDATION)
+
+    assert main.process_user(None, "a") == (True, True)
+    assert saved == [("a", RECOMMENDATION)]
+
+def test_process_user_without_movements(monkeypatch, saved):
+    prompts = []
+    monkeypatch.setattr(main, "get_user_data", lambda supabase, user_id: (None, []))
+    monkeypatch.setattr(main, "build_prompt", lambda movements, previous: prompts.append(movements) or "prompt")
+    monkeypatch.setattr(main, "get_recommendation", lambda prompt: RECOMMENDATION)
+
+    assert main.process_user(None, "a") == (True, False)
+    assert prompts == [[]]
+
+def test_process_user_without_recommendation(monkeypatch, saved):
+    monkeypatch.setattr(main, "get_user_data", lambda supabase, user_id: ([{"amount": 500}], []))
+    monkeypatch.setattr(main, "get_recommendation", lambda prompt: None)
+
+    assert main.process_user(None, "a") == (False, True)
+    assert saved == []
+
+def test_process_user_propagates_errors(monkeypatch, saved):
+    def fail(supabase, user_id):
+        raise RuntimeError("supabase caído")
+
+    monkeypatch.setattr(main, "get_user_data", fail)
+
+    with pytest.raises(RuntimeError):
+        main.process_user(None, "a")
@@ -0,0 +1,96 @@
+import asyncio
+import threading
+
+from database.listener import LocalChannel
+from worker import run_worker
+
+DELAY = 0.05
+
+def run(coro):
+    return asyncio.run(coro)
+
+def _options(**overrides):
+    options = {
+        "check_connection": lambda: True,
+        "debounce_seconds": DELAY,
+        "grace_seconds": DELAY * 2,
+        "check_interval": DELAY / 5,
+        "flush_timeout": 1,
+    }
+    options.update(overrides)
+    return options
+
+def test_worker_processes_inserts_in_a_thread_and_stops_cleanly():
+    async def scenario():
+        processed = []
+        main_thread = threading.get_ident()
+
+        def process_user(user_id):
+            processed.append((user_id, threading.get_ident() != main_thread))
+
+        channel = LocalChannel()
+        stop = asyncio.Event()
+        worker = asyncio.create_task(run_worker(channel, process_user, stop=stop, **_options(debounce_seconds=60)))
+
+        await asyncio.sleep(DELAY)
+        channel.emit({"uid": "a"})
+        channel.emit({"uid": "b"})
+        stop.set()
+
+        # Los usuarios pendientes se procesan al detener el worker aunque no haya vencido la espera
+        assert await asyncio.wait_for(worker, 2) == 0
+        assert sorted(processed) == [("a", True), ("b", True)]
+        assert channel.state == "closed"
+
+    run(scenario())
+
+def test_worker_exits_with_error_when_connection_is_lost():
+    async def scenario():
+        processed = []
+        channel = LocalChannel()
+        worker = asyncio.create_task(run_worker(channel, processed.append, **_options(debounce_seconds=60)))
+
+        await asyncio.sleep(DELAY)
+        channel.emit({"uid": "a"})
+        channel.set_status("CHANNEL_ERROR")
+
+        assert await asyncio.wait_for(worker, 2) == 1
+        assert processed == ["a"]
+
+    run(scenario())
+
+def test_worker_catches_up_on_start():
+    async def scenario():
+        processed = []
+        stop = asyncio.Event()
+        worker = asyncio.create_task(run_worker(
+            LocalChannel(), processed.append, stop=stop,
+            find_pending_users=lambda: ["offline"], **_options()
+        ))
+
+        await asyncio.sleep(DELAY * 4)
+        assert processed == ["offline"]
+        stop.set()
+        assert await asyncio.wait_for(worker, 2) == 0
+
+    run(scenario())
+
+def test_worker_stops_when_gemini_is_unavailable():
+    channel = LocalChannel()
+
+    assert run(run_worker(channel, print, **_options(check_connection=lambda: False))) == 1
+    assert channel.state == "closed"
+
+def test_worker_stops_when_subscription_fails():
+    class ClosableSocket:
+        is_connected = True
+        closed = False
+
+        async def close(self):
+            self.closed = True
+
+    socket = ClosableSocket()
+    channel = LocalChannel(subscribe_status="CHANNEL_ERROR")
+
+    assert run(run_worker(channel, print, socket=socket, **_options())) == 1
+    assert socket.closed
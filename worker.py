@@ -0,0 +1,149 @@
+"""
+Worker en tiempo real: genera recomendaciones cuando llegan transacciones nuevas.
+
+Uso:
+    python worker.py
+
+Debe ejecutarse bajo un supervisor que lo reinicie (ver
+deploy/recommendations-worker.service). El proceso termina con código 1 si la
+conexión realtime no se recupera y con 0 al recibir SIGINT/SIGTERM.
+Al arrancar y tras cada reconexión recupera a los usuarios con transacciones
+posteriores a su última recomendación.
+"""
+import asyncio
+import os
+import signal
+import sys
+from functools import partial
+from database.client import init_supabase, init_async_supabase
+from database.fetch_data import get_user_ids_pending_recommendation
+from database.listener import TransactionDebouncer, ConnectionMonitor, subscribe_to_transactions
+from llm.gemini_api import test_gemini_connection
+from main import process_user
+
+# Minutos de espera tras la última transacción de un usuario antes de recomendar
+DEBOUNCE_MINUTES = float(os.getenv("RECOMMENDATION_DEBOUNCE_MINUTES", "10"))
+# Segundos que se deja reconectar a realtime-py antes de salir (sus 5 reintentos tardan ~31s)
+GRACE_SECONDS = float(os.getenv("REALTIME_GRACE_SECONDS", "120"))
+# Días hacia atrás en los que se buscan transacciones sin recomendación al arrancar
+CATCH_UP_DAYS = int(os.getenv("RECOMMENDATION_CATCH_UP_DAYS", "3"))
+# Segundos máximos para procesar a los usuarios pendientes al detener el worker
+FLUSH_TIMEOUT_SECONDS = float(os.getenv("WORKER_FLUSH_TIMEOUT_SECONDS", "60"))
+
+async def _close_connection(channel, socket):
+    try:
+        await channel.unsubscribe()
+    except Exception as e:
+        print(f"⚠️ Error cerrando el canal realtime: {e}")
+
+    if socket is not None:
+        try:
+            # Detiene también la reconexión automática de realtime-py
+            await socket.close()
+        except Exception as e:
+            print(f"⚠️ Error cerrando la conexión realtime: {e}")
+
+async def run_worker(channel, process_user, socket=None, find_pending_users=None,
+                     check_connection=test_gemini_connection, stop=None,
+                     debounce_seconds=DEBOUNCE_MINUTES * 60, grace_seconds=GRACE_SECONDS,
+                     check_interval=5, flush_timeout=FLUSH_TIMEOUT_SECONDS):
+    """
+    Ejecuta el worker sobre un canal ya creado hasta que se detiene o se pierde la conexión
+
+    Args:
+        channel: Canal de Supabase Realtime (o LocalChannel)
+        process_user (callable): Función síncrona que recibe un user_id
+        socket: Cliente realtime subyacente (opcional), p. ej. client.realtime
+        find_pending_users (callable): Función síncrona que devuelve los user_ids a recuperar
+        check_connection (callable): Verificación previa de Gemini
+        stop (asyncio.Event): Detiene el worker de forma ordenada al activarse
+
+    Returns:
+        int: 0 si se detuvo con `stop`, 1 si hubo un error para que el supervisor lo reinicie
+    """
+    print("🔍 Verificando conexión con Gemini...")
+    if not check_connection():
+        print("❌ No se puede conectar con Gemini. Verifica tu API key.")
+        return 1
+
+    async def process(user_id):
+        # Las consultas y Gemini son síncronas: se ejecutan fuera del event loop
+        await asyncio.to_thread(process_user, user_id)
+
+    debouncer = TransactionDebouncer(process, debounce_seconds)
+
+    async def catch_up():
+        if find_pending_users is None:
+            return
+
+        try:
+            user_ids = await asyncio.to_thread(find_pending_users)
+        except Exception as e:
+            print(f"❌ Error buscando usuarios pendientes: {e}")
+            return
+
+        print(f"🔁 Usuarios con transacciones sin recomendación: {len(user_ids)}")
+        for user_id in user_ids:
+            debouncer.schedule(user_id)
+
+    monitor = ConnectionMonitor(channel, socket, grace_seconds, check_interval, on_recover=catch_up)
+
+    try:
+        await subscribe_to_transactions(channel, debouncer, monitor, timeout=grace_seconds)
+    except Exception as e:
+        print(f"❌ No se pudo suscribir a realtime: {e}")
+        await _close_connection(channel, socket)
+        return 1
+
+    # Después de suscribirse, para no perder transacciones entre la consulta y la suscripción
+    await catch_up()
+
+    print(f"🚀 Worker en tiempo real iniciado (espera de {debounce_seconds / 60:g} min por usuario)")
+
+    stop = stop or asyncio.Event()
+    lost = asyncio.create_task(monitor.wait_until_lost())
+    stopped = asyncio.create_task(stop.wait())
+
+    try:
+        await asyncio.wait({lost, stopped}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        lost.cancel()
+        stopped.cancel()
+        print("🛑 Deteniendo worker, procesando usuarios pendientes...")
+        await _close_connection(channel, socket)
+        await debouncer.flush(timeout=flush_timeout)
+
+    return 0 if stop.is_set() else 1
+
+async def start():
+    supabase = init_supabase()
+    realtime_client = await init_async_supabase()
+
+    # broadcast.self permite que el worker reciba sus propios pings de verificación
+    channel = realtime_client.channel("transactions-inserts", {"config": {"broadcast": {"self": True}}})
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+
+    def request_stop():
+        print("🛑 Señal recibida; se procesarán los usuarios pendientes (repite para forzar la salida)")
+        stop.set()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(sig)
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, request_stop)
+
+    return await run_worker(
+        channel,
+        partial(process_user, supabase),
+        socket=realtime_client.realtime,
+        find_pending_users=partial(get_user_ids_pending_recommendation, supabase, CATCH_UP_DAYS),
+        stop=stop,
+    )
+
+if __name__ == "__main__":
+    try:
+        sys.exit(asyncio.run(start()))
+    except KeyboardInterrupt:
+        sys.exit(130)